@@ -3,14 +3,158 @@
 Streamlit app for the plagiarism detector.
 """
 
-import os
-import tempfile
 import streamlit as st
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 import networkx as nx
+import plotly.graph_objects as go
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.sparse import csr_matrix
+from scipy.spatial.distance import squareform
+from code_parser import CodeParser
 from plagiarism_detector import PlagiarismDetector
+from rabin_karp import RabinKarp
+
+# Heatmap size limits: per-cell annotations, block reordering, and drawn cells per side
+HEATMAP_ANNOT_LIMIT = 30
+HEATMAP_REORDER_LIMIT = 500
+HEATMAP_MAX_CELLS = 1000
+
+# Largest table pandas Styler will render (its styler.render.max_elements default)
+STYLER_MAX_CELLS = 262144
+
+@st.cache_data(show_spinner=False)
+def submission_tokens(file_name, content):
+    """
+    Parse one uploaded submission.
+
+    Cached per file, so adding or removing an upload only parses the files
+    that changed.
+
+    Args:
+        file_name: Uploaded file name, used to detect the language
+        content: Uploaded file contents as bytes
+
+    Returns:
+        List of tokens
+    """
+    return CodeParser().parse_bytes(content, file_name)
+
+def compute_similarity_matrix(hash_arrays):
+    """
+    Compute the pairwise Jaccard similarity of k-gram sets for all submissions.
+
+    Args:
+        hash_arrays: List of arrays of distinct k-gram hashes, one per submission
+
+    Returns:
+        NumPy array of shape (N, N) with similarity scores between 0.0 and 1.0
+    """
+    n = len(hash_arrays)
+    sizes = np.array([len(hashes) for hashes in hash_arrays], dtype=np.float64)
+
+    # Sparse incidence matrix: one row per submission, one column per distinct k-gram
+    all_hashes = np.concatenate(hash_arrays) if hash_arrays else np.empty(0, dtype=np.int64)
+    _, columns = np.unique(all_hashes, return_inverse=True)
+    rows = np.repeat(np.arange(n), sizes.astype(np.int64))
+    incidence = csr_matrix(
+        (np.ones(len(columns)), (rows, columns)),
+        shape=(n, int(columns.max()) + 1 if len(columns) else 0)
+    )
+
+    # |A ∩ B| for every pair in one sparse product, then |A ∪ B| from the set sizes
+    intersection = (incidence @ incidence.T).toarray()
+    union = sizes[:, None] + sizes[None, :] - intersection
+    similarity = np.divide(
+        intersection, union,
+        out=np.zeros((n, n)),
+        where=union > 0
+    )
+    np.fill_diagonal(similarity, 1.0)
+
+    return similarity
+
+@st.cache_data(show_spinner=False)
+def compute_sim_matrix(file_names, file_contents, k):
+    """
+    Parse uploaded submissions and compute their similarity matrix.
+
+    Cached on the file contents and k-gram size, so changing the threshold
+    or switching views does not re-run tokenization and hashing.
+
+    Args:
+        file_names: Tuple of uploaded file names
+        file_contents: Tuple of uploaded file contents as bytes
+        k: Size of the k-grams
+
+    Returns:
+        Tuple of (submission IDs, similarity matrix)
+    """
+    # Hash with the detector's Rabin-Karp; its token table lives only for this call
+    rabin_karp = RabinKarp(k)
+    hashes = {}
+    for file_name, content in zip(file_names, file_contents):
+        kgrams = rabin_karp.kgrams_of(submission_tokens(file_name, content))
+        hashes[file_name] = np.fromiter(kgrams, dtype=np.int64, count=len(kgrams))
+
+    submissions = list(hashes.keys())
+    return submissions, compute_similarity_matrix([hashes[s] for s in submissions])
+
+@st.cache_data(show_spinner=False)
+def compute_clusters(similarity_matrix, submissions, threshold, max_representatives):
+    """
+    Cluster submissions and select representatives from a similarity matrix.
+
+    Args:
+        similarity_matrix: Similarity matrix from compute_sim_matrix
+        submissions: Tuple of submission IDs in matrix order
+        threshold: Threshold for considering two submissions similar
+        max_representatives: Maximum number of representatives per cluster
+
+    Returns:
+        List of clusters, each containing similar submissions and representatives
+    """
+    detector = PlagiarismDetector(similarity_threshold=threshold)
+    detector.greedy_selection.max_representatives = max_representatives
+
+    # Feed the graph in upload order, as add_submission would
+    edges = []
+    for j, submission in enumerate(submissions):
+        detector.metadata_store.insert(submission, {"filename": submission})
+        for i in range(j):
+            if similarity_matrix[i, j] >= threshold:
+                edges.append((submission, submissions[i], similarity_matrix[i, j]))
+    detector.similarity_graph.add_edges(edges)
+
+    return detector.detect_plagiarism()
+
+def downsample_heatmap(similarity_matrix, submissions):
+    """
+    Prepare a large similarity matrix for display as a raster image.
+
+    Above HEATMAP_REORDER_LIMIT submissions, rows and columns are reordered by
+    average-linkage clustering so groups of similar files form visible blocks.
+    The matrix is then strided down to at most HEATMAP_MAX_CELLS per side.
+
+    Args:
+        similarity_matrix: Similarity matrix from compute_sim_matrix
+        submissions: List of submission IDs in matrix order
+
+    Returns:
+        Tuple of (matrix to draw, labels of its rows and columns)
+    """
+    n = len(submissions)
+    order = np.arange(n)
+
+    if n > HEATMAP_REORDER_LIMIT:
+        distances = squareform(1.0 - similarity_matrix, checks=False)
+        order = leaves_list(linkage(distances, method="average"))
+
+    step = -(-n // HEATMAP_MAX_CELLS)
+    order = order[::step]
+
+    return similarity_matrix[np.ix_(order, order)], [submissions[i] for i in order]
 
 # Set page configuration
 st.set_page_config(
@@ -79,218 +223,188 @@ metadata_file = st.file_uploader(
     type=["csv", "txt"]
 )
 
-# Process files when the user clicks the button
-if st.button("Detect Plagiarism") and uploaded_files:
+# Remember the request so results stay on screen when a setting changes
+if st.button("Detect Plagiarism"):
+    st.session_state.detect_requested = True
+
+# Process files once detection has been requested
+if st.session_state.get("detect_requested") and uploaded_files:
     # Create a progress bar
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    # Create a temporary directory to store uploaded files
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Save uploaded files to the temporary directory
-        status_text.text("Saving uploaded files...")
-        file_paths = []
-        for i, uploaded_file in enumerate(uploaded_files):
-            file_path = os.path.join(temp_dir, uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            file_paths.append(file_path)
-            progress_bar.progress((i + 1) / (len(uploaded_files) + 3))
-        
-        # Save metadata file if provided
-        metadata_path = None
-        if metadata_file:
-            status_text.text("Processing metadata...")
-            metadata_path = os.path.join(temp_dir, "metadata.csv")
-            with open(metadata_path, "wb") as f:
-                f.write(metadata_file.getbuffer())
-        
-        # Create a plagiarism detector
-        status_text.text("Initializing plagiarism detector...")
-        detector = PlagiarismDetector(
-            similarity_threshold=similarity_threshold
-        )
-        progress_bar.progress((len(uploaded_files) + 1) / (len(uploaded_files) + 3))
-        
-        # Process the files
-        status_text.text("Detecting plagiarism...")
-        
-        # Add each file to the detector
-        for file_path in file_paths:
-            file_name = os.path.basename(file_path)
-            detector.add_submission(file_path, {"filename": file_name})
-        
-        # Detect plagiarism
-        results = detector.detect_plagiarism()
-        progress_bar.progress((len(uploaded_files) + 2) / (len(uploaded_files) + 3))
-        
-        # Calculate similarity matrix
-        status_text.text("Generating similarity matrix...")
-        submissions = list(detector.submissions.keys())
-        similarity_matrix = []
-        
-        for s1 in submissions:
-            row = []
-            for s2 in submissions:
-                if s1 == s2:
-                    similarity = 1.0
-                else:
-                    tokens1 = detector.submissions[s1]
-                    tokens2 = detector.submissions[s2]
-                    similarity = detector.rabin_karp.calculate_similarity(tokens1, tokens2)
-                row.append(similarity)
-            similarity_matrix.append(row)
+    # Read the uploads once; the cached stages are keyed on file contents
+    file_names = tuple(uploaded_file.name for uploaded_file in uploaded_files)
+    file_contents = tuple(uploaded_file.getvalue() for uploaded_file in uploaded_files)
+    
+    # Parse the submissions and calculate the similarity matrix
+    status_text.text("Generating similarity matrix...")
+    submissions, similarity_matrix = compute_sim_matrix(file_names, file_contents, k_gram_size)
+    idx_of = {submission: i for i, submission in enumerate(submissions)}
+    progress_bar.progress(0.5)
+    
+    # Detect plagiarism
+    status_text.text("Detecting plagiarism...")
+    results = compute_clusters(
+        similarity_matrix, tuple(submissions), similarity_threshold, max_representatives
+    )
+    
+    progress_bar.progress(1.0)
+    status_text.text("Analysis complete!")
+    
+    # Display results
+    st.header("Plagiarism Detection Results")
+    
+    if not results:
+        st.warning("No clusters of similar submissions found.")
+    else:
+        st.success(f"Found {len(results)} clusters of similar submissions.")
         
-        progress_bar.progress(1.0)
-        status_text.text("Analysis complete!")
+        # Create tabs for different views
+        tab1, tab2, tab3 = st.tabs(["Clusters", "Similarity Matrix", "Network Graph"])
         
-        # Display results
-        st.header("Plagiarism Detection Results")
+        with tab1:
+            # Display clusters
+            for i, result in enumerate(results):
+                with st.expander(f"Cluster {i+1} ({len(result['cluster'])} submissions)", expanded=True):
+                    # Get the representatives for this cluster
+                    representatives = set(result['representatives'])
+                    
+                    # Create a table of submissions
+                    cluster_data = []
+                    for submission in result['cluster']:
+                        submission_id = submission['id']
+                        is_representative = submission_id in representatives
+                        cluster_data.append({
+                            "File": submission_id,
+                            "Representative": "✓" if is_representative else "",
+                            "Metadata": str(submission.get('metadata', {}))
+                        })
+                    
+                    st.dataframe(pd.DataFrame(cluster_data))
+                    
+                    # Show similarity information
+                    st.subheader("Similarity Information")
+                    cluster_ids = [submission['id'] for submission in result['cluster']]
+                    cluster_idx = [idx_of[submission_id] for submission_id in cluster_ids]
+                    cluster_similarity = similarity_matrix[np.ix_(cluster_idx, cluster_idx)]
+                    
+                    # Only show each pair once, taken from the upper triangle
+                    rows, cols = np.triu_indices(len(cluster_ids), k=1)
+                    names = np.array(cluster_ids, dtype=object)
+                    similarity_data = pd.DataFrame({
+                        "File 1": names[rows],
+                        "File 2": names[cols],
+                        "Similarity": pd.Series(cluster_similarity[rows, cols]).map("{:.2%}".format)
+                    })
+                    
+                    st.dataframe(similarity_data)
         
-        if not results:
-            st.warning("No clusters of similar submissions found.")
-        else:
-            st.success(f"Found {len(results)} clusters of similar submissions.")
+        with tab2:
+            # Display similarity matrix as a heatmap
+            st.subheader("Similarity Matrix Heatmap")
             
-            # Create tabs for different views
-            tab1, tab2, tab3 = st.tabs(["Clusters", "Similarity Matrix", "Network Graph"])
+            # Create a DataFrame for the similarity matrix
+            df_similarity = pd.DataFrame(
+                similarity_matrix,
+                index=submissions,
+                columns=submissions
+            )
             
-            with tab1:
-                # Display clusters
-                for i, result in enumerate(results):
-                    with st.expander(f"Cluster {i+1} ({len(result['cluster'])} submissions)", expanded=True):
-                        # Get the representatives for this cluster
-                        representatives = result['representatives']
-                        
-                        # Create a table of submissions
-                        cluster_data = []
-                        for submission in result['cluster']:
-                            submission_id = submission['id']
-                            is_representative = submission_id in representatives
-                            cluster_data.append({
-                                "File": submission_id,
-                                "Representative": "✓" if is_representative else "",
-                                "Metadata": str(submission.get('metadata', {}))
-                            })
-                        
-                        st.table(pd.DataFrame(cluster_data))
-                        
-                        # Show similarity information
-                        st.subheader("Similarity Information")
-                        similarity_data = []
-                        for idx1, sub1 in enumerate(result['cluster']):
-                            sub1_id = sub1['id']
-                            for idx2, sub2 in enumerate(result['cluster']):
-                                if idx1 < idx2:  # Only show each pair once
-                                    sub2_id = sub2['id']
-                                    similarity = detector.rabin_karp.calculate_similarity(
-                                        detector.submissions[sub1_id], 
-                                        detector.submissions[sub2_id]
-                                    )
-                                    similarity_data.append({
-                                        "File 1": sub1_id,
-                                        "File 2": sub2_id,
-                                        "Similarity": f"{similarity:.2%}"
-                                    })
-                        
-                        st.table(pd.DataFrame(similarity_data))
+            # Create a heatmap; plotly draws it client-side as a single canvas
+            heatmap_matrix, heatmap_labels = downsample_heatmap(similarity_matrix, submissions)
+            annotate = len(heatmap_labels) <= HEATMAP_ANNOT_LIMIT
+            fig = go.Figure(go.Heatmap(
+                z=heatmap_matrix,
+                x=heatmap_labels,
+                y=heatmap_labels,
+                colorscale="YlGnBu",
+                zmin=0.0,
+                zmax=1.0,
+                texttemplate="%{z:.2f}" if annotate else None
+            ))
+            fig.update_layout(title="Similarity Matrix", height=700)
+            fig.update_yaxes(autorange="reversed")
+            st.plotly_chart(fig)
             
-            with tab2:
-                # Display similarity matrix as a heatmap
-                st.subheader("Similarity Matrix Heatmap")
-                
-                # Create a DataFrame for the similarity matrix
-                df_similarity = pd.DataFrame(
-                    similarity_matrix,
-                    index=submissions,
-                    columns=submissions
-                )
-                
-                # Create a heatmap
-                fig, ax = plt.subplots(figsize=(10, 8))
-                sns.heatmap(
-                    df_similarity,
-                    annot=True,
-                    cmap="YlGnBu",
-                    fmt=".2f",
-                    linewidths=.5,
-                    ax=ax
-                )
-                plt.title("Similarity Matrix")
-                st.pyplot(fig)
-                
-                # Display the raw similarity matrix as a table
-                st.subheader("Similarity Matrix Table")
+            # Display the raw similarity matrix as a table. Pandas Styler refuses
+            # tables above STYLER_MAX_CELLS cells, so larger matrices are
+            # formatted as percentage strings instead
+            st.subheader("Similarity Matrix Table")
+            if len(submissions) ** 2 <= STYLER_MAX_CELLS:
                 st.dataframe(df_similarity.style.format("{:.2%}"))
-            
-            with tab3:
-                # Display network graph of similarities
-                st.subheader("Similarity Network Graph")
-                
-                # Create a graph
-                G = nx.Graph()
-                
-                # Add nodes
-                for submission in submissions:
-                    G.add_node(submission)
-                
-                # Add edges with weight >= threshold
-                for i, s1 in enumerate(submissions):
-                    for j, s2 in enumerate(submissions):
-                        if i < j:  # Only add each edge once
-                            similarity = similarity_matrix[i][j]
-                            if similarity >= similarity_threshold:
-                                G.add_edge(s1, s2, weight=similarity)
-                
-                # Draw the graph
-                fig, ax = plt.subplots(figsize=(10, 8))
-                pos = nx.spring_layout(G, seed=42)
-                
-                # Draw nodes
-                nx.draw_networkx_nodes(G, pos, node_size=500, alpha=0.8)
-                
-                # Draw edges with width proportional to similarity
-                for u, v, data in G.edges(data=True):
-                    width = data['weight'] * 5  # Scale width
-                    nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], width=width, alpha=0.7)
-                
-                # Draw labels
-                nx.draw_networkx_labels(G, pos, font_size=10)
-                
-                plt.title("Similarity Network (edges represent similarity ≥ threshold)")
-                plt.axis("off")
-                st.pyplot(fig)
-        
-        # Display summary of all submissions
-        st.header("Summary of All Submissions")
-        
-        # Group submissions by cluster
-        clustered_submissions = set()
-        for result in results:
-            for submission in result['cluster']:
-                clustered_submissions.add(submission['id'])
-        
-        # Find submissions not in any cluster
-        all_submissions = set(detector.submissions.keys())
-        unclustered_submissions = all_submissions - clustered_submissions
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.subheader("Submissions in Clusters")
-            if clustered_submissions:
-                for submission_id in sorted(clustered_submissions):
-                    st.write(f"- {submission_id}")
             else:
-                st.write("None")
+                st.dataframe(df_similarity.apply(lambda column: column.map("{:.2%}".format)))
         
-        with col2:
-            st.subheader("Submissions Not in Any Cluster")
-            if unclustered_submissions:
-                for submission_id in sorted(unclustered_submissions):
-                    st.write(f"- {submission_id}")
-            else:
-                st.write("None")
+        with tab3:
+            # Display network graph of similarities
+            st.subheader("Similarity Network Graph")
+            
+            # Create a graph
+            G = nx.Graph()
+            
+            # Add nodes
+            G.add_nodes_from(submissions)
+            
+            # Add edges with weight >= threshold, taking each pair once from the upper triangle
+            rows, cols = np.triu_indices(len(submissions), k=1)
+            mask = similarity_matrix[rows, cols] >= similarity_threshold
+            G.add_weighted_edges_from(
+                (submissions[i], submissions[j], similarity_matrix[i, j])
+                for i, j in zip(rows[mask], cols[mask])
+            )
+            
+            # Draw the graph
+            fig, ax = plt.subplots(figsize=(10, 8))
+            pos = nx.spring_layout(G, seed=42)
+            
+            # Draw nodes
+            nx.draw_networkx_nodes(G, pos, node_size=500, alpha=0.8)
+            
+            # Draw edges with width proportional to similarity, in a single collection
+            edges = list(G.edges(data='weight'))
+            nx.draw_networkx_edges(
+                G, pos,
+                edgelist=[(u, v) for u, v, _ in edges],
+                width=[weight * 5 for _, _, weight in edges],  # Scale width
+                alpha=0.7
+            )
+            
+            # Draw labels
+            nx.draw_networkx_labels(G, pos, font_size=10)
+            
+            plt.title("Similarity Network (edges represent similarity ≥ threshold)")
+            plt.axis("off")
+            st.pyplot(fig)
+    
+    # Display summary of all submissions
+    st.header("Summary of All Submissions")
+    
+    # Group submissions by cluster
+    clustered_submissions = {
+        submission['id'] for result in results for submission in result['cluster']
+    }
+    
+    # Find submissions not in any cluster
+    unclustered_submissions = set(submissions) - clustered_submissions
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Submissions in Clusters")
+        if clustered_submissions:
+            for submission_id in sorted(clustered_submissions):
+                st.write(f"- {submission_id}")
+        else:
+            st.write("None")
+    
+    with col2:
+        st.subheader("Submissions Not in Any Cluster")
+        if unclustered_submissions:
+            for submission_id in sorted(unclustered_submissions):
+                st.write(f"- {submission_id}")
+        else:
+            st.write("None")
 
 # Add information about how to use the app
 with st.expander("How to Use This App"):
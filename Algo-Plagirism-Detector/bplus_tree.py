@@ -4,6 +4,7 @@ B+ Tree Module
 This module implements a B+ Tree for efficient metadata storage and retrieval.
 """
 
+from bisect import bisect_left, bisect_right
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 class BPlusTreeNode:
@@ -55,9 +56,7 @@ class BPlusTreeLeafNode(BPlusTreeNode):
             None if no split occurred, or a tuple (median_key, left_node, right_node) if split occurred
         """
         # Find the position to insert the key
-        i = 0
-        while i < len(self.keys) and self.keys[i] < key:
-            i += 1
+        i = bisect_left(self.keys, key)
         
         # If the key already exists, update the value
         if i < len(self.keys) and self.keys[i] == key:
@@ -99,9 +98,9 @@ class BPlusTreeLeafNode(BPlusTreeNode):
         Returns:
             Value associated with the key, or None if the key is not found
         """
-        for i, k in enumerate(self.keys):
-            if k == key:
-                return self.values[i]
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[i]
         return None
 
 class BPlusTreeInternalNode(BPlusTreeNode):
@@ -130,9 +129,7 @@ class BPlusTreeInternalNode(BPlusTreeNode):
             None if no split occurred, or a tuple (median_key, left_node, right_node) if split occurred
         """
         # Find the position to insert the key
-        i = 0
-        while i < len(self.keys) and self.keys[i] < key:
-            i += 1
+        i = bisect_left(self.keys, key)
         
         # Insert the key and right child
         self.keys.insert(i, key)
@@ -176,10 +173,7 @@ class BPlusTreeInternalNode(BPlusTreeNode):
         Returns:
             Child node that should contain the key
         """
-        i = 0
-        while i < len(self.keys) and key >= self.keys[i]:
-            i += 1
-        return self.children[i]
+        return self.children[bisect_right(self.keys, key)]
 
 class BPlusTree:
     """
@@ -304,12 +298,14 @@ class BPlusTree:
         
         # Traverse the leaf nodes until we find the end key or run out of nodes
         while leaf:
-            # Check each key in the current leaf node
-            for i, key in enumerate(leaf.keys):
-                if start_key <= key <= end_key:
-                    results.append((key, leaf.values[i]))
-                elif key > end_key:
-                    return results
+            # Slice out the keys of the current leaf node that fall in the range
+            lo = bisect_left(leaf.keys, start_key)
+            hi = bisect_right(leaf.keys, end_key)
+            results.extend(zip(leaf.keys[lo:hi], leaf.values[lo:hi]))
+            
+            # A key past the end of the range means no later leaf can match
+            if hi < len(leaf.keys):
+                return results
             
             # Move to the next leaf node
             leaf = leaf.next_leaf
@@ -4,7 +4,8 @@ Clustering Module
 This module implements clustering algorithms for finding groups of similar submissions.
 """
 
-from typing import List, Set, Dict
+from collections import deque
+from typing import List, Dict
 from similarity_graph import SimilarityGraph
 
 class Clustering:
@@ -32,16 +33,17 @@ class Clustering:
             List of clusters, where each cluster is a list of submission IDs
         """
         nodes = graph.get_nodes()
-        visited = set()
+        adjacency = self._build_adjacency(graph, nodes)
+        visited = [False] * len(nodes)
         clusters = []
         
         # Use BFS to find connected components
-        for node in nodes:
-            if node in visited:
+        for start in range(len(nodes)):
+            if visited[start]:
                 continue
                 
             # Start BFS from this node
-            cluster = self._bfs(graph, node, visited)
+            cluster = [nodes[i] for i in self._bfs(adjacency, start, visited)]
             
             # Only consider clusters with at least min_cluster_size nodes
             if len(cluster) >= self.min_cluster_size:
@@ -49,36 +51,50 @@ class Clustering:
         
         return clusters
     
-    def _bfs(self, graph: SimilarityGraph, start_node: str, visited: Set[str]) -> List[str]:
+    def _build_adjacency(self, graph: SimilarityGraph, nodes: List[str]) -> List[List[int]]:
         """
-        Perform BFS to find a connected component.
+        Convert the graph to adjacency lists of integer node indices.
         
         Args:
             graph: Similarity graph
-            start_node: Node to start BFS from
-            visited: Set of already visited nodes
+            nodes: List of nodes, defining the index of each node
+            
+        Returns:
+            List where entry i holds the indices of the neighbors of nodes[i]
+        """
+        id_of = {node: i for i, node in enumerate(nodes)}
+        return [[id_of[neighbor] for neighbor in graph.get_neighbors(node)] for node in nodes]
+    
+    def _bfs(self, adjacency: List[List[int]], start: int, visited: List[bool]) -> List[int]:
+        """
+        Perform BFS to find a connected component.
+        
+        Args:
+            adjacency: Adjacency lists of integer node indices
+            start: Index of the node to start BFS from
+            visited: Visited flag for every node index
             
         Returns:
-            List of nodes in the connected component
+            List of node indices in the connected component
         """
-        queue = [start_node]
-        cluster = []
+        queue = deque([start])
+        component = []
         
         while queue:
-            node = queue.pop(0)
+            node = queue.popleft()
             
-            if node in visited:
+            if visited[node]:
                 continue
                 
-            visited.add(node)
-            cluster.append(node)
+            visited[node] = True
+            component.append(node)
             
             # Add unvisited neighbors to the queue
-            for neighbor in graph.get_neighbors(node):
-                if neighbor not in visited:
+            for neighbor in adjacency[node]:
+                if not visited[neighbor]:
                     queue.append(neighbor)
         
-        return cluster
+        return component
     
     def find_clusters_dfs(self, graph: SimilarityGraph) -> List[List[str]]:
         """
@@ -91,17 +107,17 @@ class Clustering:
             List of clusters, where each cluster is a list of submission IDs
         """
         nodes = graph.get_nodes()
-        visited = set()
+        adjacency = self._build_adjacency(graph, nodes)
+        visited = [False] * len(nodes)
         clusters = []
         
         # Use DFS to find connected components
-        for node in nodes:
-            if node in visited:
+        for start in range(len(nodes)):
+            if visited[start]:
                 continue
                 
             # Start DFS from this node
-            cluster = []
-            self._dfs(graph, node, visited, cluster)
+            cluster = [nodes[i] for i in self._dfs(adjacency, start, visited)]
             
             # Only consider clusters with at least min_cluster_size nodes
             if len(cluster) >= self.min_cluster_size:
@@ -109,31 +125,47 @@ class Clustering:
         
         return clusters
     
-    def _dfs(self, graph: SimilarityGraph, node: str, visited: Set[str], cluster: List[str]) -> None:
+    def _dfs(self, adjacency: List[List[int]], start: int, visited: List[bool]) -> List[int]:
         """
         Perform DFS to find a connected component.
         
+        Uses an explicit stack instead of recursion, so large components
+        cannot hit the interpreter's recursion limit.
+        
         Args:
-            graph: Similarity graph
-            node: Current node
-            visited: Set of already visited nodes
-            cluster: List to store nodes in the connected component
+            adjacency: Adjacency lists of integer node indices
+            start: Index of the node to start DFS from
+            visited: Visited flag for every node index
+            
+        Returns:
+            List of node indices in the connected component, in DFS preorder
         """
-        if node in visited:
-            return
+        stack = [start]
+        component = []
+        
+        while stack:
+            node = stack.pop()
             
-        visited.add(node)
-        cluster.append(node)
+            if visited[node]:
+                continue
+                
+            visited[node] = True
+            component.append(node)
+            
+            # Push neighbors in reverse so they are visited in adjacency order
+            stack.extend(reversed([n for n in adjacency[node] if not visited[n]]))
         
-        # Visit all neighbors
-        for neighbor in graph.get_neighbors(node):
-            if neighbor not in visited:
-                self._dfs(graph, neighbor, visited, cluster)
+        return component
     
     def find_clusters_with_threshold(self, graph: SimilarityGraph, threshold: float) -> List[List[str]]:
         """
         Find clusters of similar submissions using a custom threshold.
         
+        Only the adjacency of the edges meeting the threshold is collected,
+        instead of copying them into a new graph. Nodes and neighbors are
+        inserted in the same order as such a copy, so clusters and their
+        members keep that copy's BFS order.
+        
         Args:
             graph: Similarity graph
             threshold: Custom similarity threshold
@@ -141,22 +173,43 @@ class Clustering:
         Returns:
             List of clusters, where each cluster is a list of submission IDs
         """
-        # Create a new graph with the custom threshold
-        custom_graph = SimilarityGraph(threshold)
-        
-        # Copy nodes and edges that meet the new threshold
+        # Collect the edges that meet the threshold, in both directions
+        kept = {}
         for node in graph.get_nodes():
             for neighbor, weight in graph.get_neighbors(node).items():
                 if weight >= threshold:
-                    custom_graph.add_edge(node, neighbor, weight)
+                    node_edges = kept.setdefault(node, {})
+                    neighbor_edges = kept.setdefault(neighbor, {})
+                    node_edges[neighbor] = weight
+                    neighbor_edges[node] = weight
         
-        # Find clusters in the new graph
-        return self.find_clusters(custom_graph)
+        nodes = list(kept)
+        id_of = {node: i for i, node in enumerate(nodes)}
+        adjacency = [[id_of[neighbor] for neighbor in kept[node]] for node in nodes]
+        visited = [False] * len(nodes)
+        clusters = []
+        
+        for start in range(len(nodes)):
+            if visited[start]:
+                continue
+                
+            cluster = [nodes[i] for i in self._bfs(adjacency, start, visited)]
+            
+            # Only consider clusters with at least min_cluster_size nodes
+            if len(cluster) >= self.min_cluster_size:
+                clusters.append(cluster)
+        
+        return clusters
     
     def hierarchical_clustering(self, graph: SimilarityGraph, thresholds: List[float]) -> Dict[float, List[List[str]]]:
         """
         Perform hierarchical clustering using multiple thresholds.
         
+        Edges are sorted once by weight and merged with a union-find structure
+        while walking the thresholds from highest to lowest, so each edge is
+        processed a single time regardless of the number of thresholds.
+        Members of each cluster are listed in graph node order.
+        
         Args:
             graph: Similarity graph
             thresholds: List of thresholds to use (in descending order)
@@ -164,13 +217,58 @@ class Clustering:
         Returns:
             Dictionary mapping thresholds to clusters
         """
+        nodes = graph.get_nodes()
+        id_of = {node: i for i, node in enumerate(nodes)}
+        
+        # Collect each undirected edge once, strongest first
+        edges = []
+        for i, node in enumerate(nodes):
+            for neighbor, weight in graph.get_neighbors(node).items():
+                j = id_of[neighbor]
+                if i < j:
+                    edges.append((weight, i, j))
+        edges.sort(reverse=True)
+        
+        parent = list(range(len(nodes)))
+        size = [1] * len(nodes)
+        has_edge = [False] * len(nodes)
+        
+        def find(x: int) -> int:
+            # Path halving keeps the trees shallow
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        
         results = {}
+        next_edge = 0
         
         # Sort thresholds in descending order
         sorted_thresholds = sorted(thresholds, reverse=True)
         
         for threshold in sorted_thresholds:
-            clusters = self.find_clusters_with_threshold(graph, threshold)
-            results[threshold] = clusters
+            # Merge every edge that meets this threshold
+            while next_edge < len(edges) and edges[next_edge][0] >= threshold:
+                _, i, j = edges[next_edge]
+                next_edge += 1
+                has_edge[i] = has_edge[j] = True
+                root_i, root_j = find(i), find(j)
+                if root_i == root_j:
+                    continue
+                if size[root_i] < size[root_j]:
+                    root_i, root_j = root_j, root_i
+                parent[root_j] = root_i
+                size[root_i] += size[root_j]
+            
+            # Snapshot the components of nodes that have at least one edge
+            groups = {}
+            for i, node in enumerate(nodes):
+                if has_edge[i]:
+                    groups.setdefault(find(i), []).append(node)
+            
+            results[threshold] = [
+                cluster for cluster in groups.values()
+                if len(cluster) >= self.min_cluster_size
+            ]
         
         return results
@@ -4,56 +4,77 @@ Code Parser Module
 This module handles parsing code files into tokens for comparison.
 """
 
+import io
 import re
 import os
+import sys
 from typing import List, Dict, Set, Tuple
 
+# Common keywords across programming languages
+_COMMON_KEYWORDS = frozenset({
+    'if', 'else', 'for', 'while', 'return', 'function', 'class', 'def',
+    'int', 'float', 'string', 'bool', 'true', 'false', 'null', 'None',
+    'public', 'private', 'protected', 'static', 'void', 'import', 'from'
+})
+
+# Tokens that start with a letter but are never normalized
+_KEEP_AS_IS = _COMMON_KEYWORDS | {'STRING_LITERAL'}
+
+# Regex patterns for different languages. Comments and strings are written as
+# unrolled loops (normal* (special normal*)*), so they need no DOTALL lazy
+# scans and every character is consumed by exactly one alternative.
+_LINE_COMMENT = r'#[^\n]*'
+_C_LINE_COMMENT = r'//[^\n]*'
+_BLOCK_COMMENT = r'/\*[^*]*\*+(?:[^/*][^*]*\*+)*/'
+_DOCSTRING = r'"""[^"]*(?:"(?!"")[^"]*)*"""' + '|' + r"'''[^']*(?:'(?!'')[^']*)*'''"
+_DOUBLE_QUOTED = r'"[^"\\]*(?:\\[\s\S][^"\\]*)*"'
+_SINGLE_QUOTED = r"'[^'\\]*(?:\\[\s\S][^'\\]*)*'"
+_BACKTICK_QUOTED = r'`[^`\\]*(?:\\[\s\S][^`\\]*)*`'
+
+_LANGUAGE_PATTERNS = {
+    'python': {
+        'comment': _LINE_COMMENT + '|' + _DOCSTRING,
+        'string': _DOUBLE_QUOTED + '|' + _SINGLE_QUOTED,
+        'token': r'[A-Za-z_][A-Za-z0-9_]*|\d+|\S'
+    },
+    'java': {
+        'comment': _C_LINE_COMMENT + '|' + _BLOCK_COMMENT,
+        'string': _DOUBLE_QUOTED,
+        'token': r'[A-Za-z_][A-Za-z0-9_]*|\d+|\S'
+    },
+    'cpp': {
+        'comment': _C_LINE_COMMENT + '|' + _BLOCK_COMMENT,
+        'string': _DOUBLE_QUOTED,
+        'token': r'[A-Za-z_][A-Za-z0-9_]*|\d+|\S'
+    },
+    'javascript': {
+        'comment': _C_LINE_COMMENT + '|' + _BLOCK_COMMENT,
+        'string': _DOUBLE_QUOTED + '|' + _SINGLE_QUOTED + '|' + _BACKTICK_QUOTED,
+        'token': r'[A-Za-z_][A-Za-z0-9_]*|\d+|\S'
+    }
+}
+
+# Compile regex patterns once at import, shared by all parser instances
+_COMPILED_PATTERNS = {
+    lang: {
+        'comment': re.compile(patterns['comment']),
+        'string': re.compile(patterns['string']),
+        'token': re.compile(patterns['token'])
+    }
+    for lang, patterns in _LANGUAGE_PATTERNS.items()
+}
+
 class CodeParser:
     """
     Parser for code files that converts them into tokens for comparison.
     """
 
     # Common keywords across programming languages
-    COMMON_KEYWORDS = {
-        'if', 'else', 'for', 'while', 'return', 'function', 'class', 'def',
-        'int', 'float', 'string', 'bool', 'true', 'false', 'null', 'None',
-        'public', 'private', 'protected', 'static', 'void', 'import', 'from'
-    }
+    COMMON_KEYWORDS = _COMMON_KEYWORDS
 
-    # Regex patterns for different languages
-    LANGUAGE_PATTERNS = {
-        'python': {
-            'comment': r'#.*?$|""".*?"""|\'\'\'.*?\'\'\'',
-            'string': r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'',
-            'token': r'[A-Za-z_][A-Za-z0-9_]*|\d+|\S'
-        },
-        'java': {
-            'comment': r'//.*?$|/\*.*?\*/',
-            'string': r'"(?:\\.|[^"\\])*"',
-            'token': r'[A-Za-z_][A-Za-z0-9_]*|\d+|\S'
-        },
-        'cpp': {
-            'comment': r'//.*?$|/\*.*?\*/',
-            'string': r'"(?:\\.|[^"\\])*"',
-            'token': r'[A-Za-z_][A-Za-z0-9_]*|\d+|\S'
-        },
-        'javascript': {
-            'comment': r'//.*?$|/\*.*?\*/',
-            'string': r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`',
-            'token': r'[A-Za-z_][A-Za-z0-9_]*|\d+|\S'
-        }
-    }
-
-    def __init__(self):
-        """Initialize the code parser."""
-        # Compile regex patterns for better performance
-        self.compiled_patterns = {}
-        for lang, patterns in self.LANGUAGE_PATTERNS.items():
-            self.compiled_patterns[lang] = {
-                'comment': re.compile(patterns['comment'], re.MULTILINE | re.DOTALL),
-                'string': re.compile(patterns['string'], re.MULTILINE | re.DOTALL),
-                'token': re.compile(patterns['token'])
-            }
+    # Regex patterns for different languages, compiled once at import time
+    LANGUAGE_PATTERNS = _LANGUAGE_PATTERNS
+    compiled_patterns = _COMPILED_PATTERNS
 
     def detect_language(self, file_path: str) -> str:
         """
@@ -92,17 +113,51 @@ class CodeParser:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
 
-            language = self.detect_language(file_path)
+            return self.parse_content(content, file_path)
+        except Exception as e:
+            print(f"Error parsing file {file_path}: {e}")
+            return []
+
+    def parse_bytes(self, data: bytes, file_path: str) -> List[str]:
+        """
+        Parse in-memory file contents into a list of tokens.
 
-            # Use block-insensitive tokenization for Python files
-            if language == 'python':
-                return self.tokenize_block_insensitive(content, language)
-            else:
-                return self.tokenize(content, language)
+        The bytes are decoded the same way parse_file reads a file from disk
+        (UTF-8, ignoring errors, universal newlines).
+
+        Args:
+            data: Raw contents of the code file
+            file_path: Name or path of the code file, used to detect the language
+
+        Returns:
+            List of tokens representing the code
+        """
+        try:
+            content = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='ignore').read()
+            return self.parse_content(content, file_path)
         except Exception as e:
             print(f"Error parsing file {file_path}: {e}")
             return []
 
+    def parse_content(self, content: str, file_path: str) -> List[str]:
+        """
+        Parse code content into a list of tokens.
+
+        Args:
+            content: Code content as string
+            file_path: Name or path of the code file, used to detect the language
+
+        Returns:
+            List of tokens representing the code
+        """
+        language = self.detect_language(file_path)
+
+        # Use block-insensitive tokenization for Python files
+        if language == 'python':
+            return self.tokenize_block_insensitive(content, language)
+        else:
+            return self.tokenize(content, language)
+
     def tokenize_block_insensitive(self, code: str, language: str = 'python') -> List[str]:
         """
         Tokenize code content in a way that is insensitive to block order.
@@ -122,7 +177,7 @@ class CodeParser:
         blocks = self._extract_blocks(tokens)
 
         # Sort blocks by their content to make the comparison insensitive to block order
-        sorted_blocks = sorted(blocks, key=lambda b: ''.join(b))
+        sorted_blocks = sorted(blocks, key=tuple)
 
         # Flatten the sorted blocks back into a single token list
         flattened_tokens = []
@@ -195,40 +250,29 @@ class CodeParser:
         code = patterns['comment'].sub('', code)
 
         # Replace strings with a placeholder to avoid tokenizing their contents
-        strings = []
-
-        def replace_string(match):
-            strings.append(match.group(0))
-            return 'STRING_LITERAL'
-
-        code = patterns['string'].sub(replace_string, code)
+        code = patterns['string'].sub('STRING_LITERAL', code)
 
         # Tokenize the code
         tokens = patterns['token'].findall(code)
 
-        # Normalize tokens: convert variable names to placeholders but keep structure
+        # Normalize tokens: convert variable names to placeholders but keep structure.
+        # Keywords, numbers, operators and punctuation are kept as is.
         normalized_tokens = []
+        append = normalized_tokens.append
         var_map = {}  # Map original variable names to normalized names
-        var_counter = 0
+
+        # Tokens are interned, so equal tokens of every submission share one
+        # string object; that saves memory and makes comparisons identity checks
+        intern = sys.intern
 
         for token in tokens:
-            # Skip whitespace
-            if token.isspace() or not token:
-                continue
-
-            # Keep keywords, operators, and punctuation as is
-            if (token in self.COMMON_KEYWORDS or
-                not token[0].isalpha() or
-                token == 'STRING_LITERAL'):
-                normalized_tokens.append(token)
-            # Normalize variable and function names
-            elif token[0].isalpha() or token[0] == '_':
-                if token not in var_map:
-                    var_map[token] = f"VAR_{var_counter}"
-                    var_counter += 1
-                normalized_tokens.append(var_map[token])
-            # Keep numbers and other tokens as is
+            if token in _KEEP_AS_IS or not token[0].isalpha():
+                append(intern(token))
             else:
-                normalized_tokens.append(token)
+                # Normalize variable and function names
+                var = var_map.get(token)
+                if var is None:
+                    var = var_map[token] = intern(f"VAR_{len(var_map)}")
+                append(var)
 
         return normalized_tokens
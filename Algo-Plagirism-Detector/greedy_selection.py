@@ -7,6 +7,13 @@ This module implements a greedy algorithm for selecting representative submissio
 from typing import List, Dict, Set, Tuple
 from similarity_graph import SimilarityGraph
 
+try:
+    _popcount = int.bit_count  # Python 3.10+
+except AttributeError:
+    def _popcount(mask: int) -> int:
+        """Count the set bits of a non-negative integer."""
+        return bin(mask).count('1')
+
 class GreedySelection:
     """
     Implementation of a greedy algorithm for selecting representative submissions.
@@ -40,9 +47,7 @@ class GreedySelection:
             return cluster
             
         # Calculate average similarity for each submission
-        avg_similarities = {}
-        for node in cluster:
-            avg_similarities[node] = self._calculate_average_similarity(node, cluster, graph)
+        avg_similarities = self._calculate_average_similarities(cluster, cluster, graph)
             
         # Sort submissions by average similarity (descending)
         sorted_submissions = sorted(
@@ -56,31 +61,42 @@ class GreedySelection:
         
         return representatives
     
-    def _calculate_average_similarity(self, node: str, cluster: List[str], graph: SimilarityGraph) -> float:
+    def _calculate_average_similarities(self, nodes: List[str], cluster: List[str],
+                                        graph: SimilarityGraph) -> Dict[str, float]:
         """
-        Calculate the average similarity between a node and all other nodes in the cluster.
+        Calculate the average similarity between each of several nodes and all
+        other nodes in the cluster.
+        
+        Only the edges of each node are visited, instead of looking up the
+        weight of every pair of cluster nodes.
         
         Args:
-            node: Node to calculate average similarity for
+            nodes: Nodes to calculate average similarity for
             cluster: List of nodes in the cluster
             graph: Similarity graph
             
         Returns:
-            Average similarity
+            Dictionary mapping each node to its average similarity
         """
-        total_similarity = 0.0
-        count = 0
+        # Add up weights in cluster order to keep the previous float results and tie-breaking
+        position = {node: i for i, node in enumerate(cluster)}
+        count = len(cluster) - 1
         
-        for other_node in cluster:
-            if other_node != node:
-                similarity = graph.get_edge_weight(node, other_node)
-                total_similarity += similarity
-                count += 1
-        
-        if count == 0:
-            return 0.0
+        avg_similarities = {}
+        for node in nodes:
+            weights = sorted(
+                (position[neighbor], weight)
+                for neighbor, weight in graph.get_neighbors(node).items()
+                if neighbor in position and neighbor != node
+            )
             
-        return total_similarity / count
+            total_similarity = 0.0
+            for _, weight in weights:
+                total_similarity += weight
+            
+            avg_similarities[node] = total_similarity / count if count > 0 else 0.0
+        
+        return avg_similarities
     
     def select_representatives_coverage(self, cluster: List[str], graph: SimilarityGraph) -> List[str]:
         """
@@ -100,52 +116,51 @@ class GreedySelection:
         if len(cluster) <= self.max_representatives:
             return cluster
             
-        # Initialize set of covered nodes and representatives
-        covered = set()
+        # Cluster nodes each node is similar to, as a bitmask over cluster indices
+        index = {node: i for i, node in enumerate(cluster)}
+        covers = []
+        for i, node in enumerate(cluster):
+            mask = 0
+            for neighbor, weight in graph.get_neighbors(node).items():
+                j = index.get(neighbor)
+                if j is not None and j != i and weight > 0:
+                    mask |= 1 << j
+            covers.append(mask)
+        
+        # Initialize bitmask of covered nodes and representatives
+        all_covered = (1 << len(cluster)) - 1
+        covered = 0
         representatives = []
         
         # Continue until we have enough representatives or all nodes are covered
-        while len(representatives) < self.max_representatives and len(covered) < len(cluster):
-            best_node = None
+        while len(representatives) < self.max_representatives and covered != all_covered:
+            best_index = None
             best_coverage = -1
             
             # Find the node that covers the most uncovered nodes
-            for node in cluster:
+            for i, node in enumerate(cluster):
                 if node in representatives:
                     continue
                     
-                # Calculate coverage (number of nodes this node is similar to)
-                coverage = 0
-                for other_node in cluster:
-                    if other_node != node and other_node not in covered:
-                        if graph.get_edge_weight(node, other_node) > 0:
-                            coverage += 1
+                # Calculate coverage (number of uncovered nodes this node is similar to)
+                coverage = _popcount(covers[i] & ~covered)
                 
                 if coverage > best_coverage:
                     best_coverage = coverage
-                    best_node = node
+                    best_index = i
             
-            if best_node is None or best_coverage == 0:
+            if best_index is None or best_coverage == 0:
                 # No more nodes can be covered, break
                 break
                 
-            # Add the best node to representatives
-            representatives.append(best_node)
-            covered.add(best_node)
-            
-            # Add all nodes covered by this representative
-            for other_node in cluster:
-                if other_node != best_node and other_node not in covered:
-                    if graph.get_edge_weight(best_node, other_node) > 0:
-                        covered.add(other_node)
+            # Add the best node to representatives, along with all nodes it covers
+            representatives.append(cluster[best_index])
+            covered |= covers[best_index] | (1 << best_index)
         
         # If we still need more representatives, add the nodes with highest average similarity
         if len(representatives) < self.max_representatives:
             remaining = [node for node in cluster if node not in representatives]
-            avg_similarities = {}
-            
-            for node in remaining:
-                avg_similarities[node] = self._calculate_average_similarity(node, cluster, graph)
+            avg_similarities = self._calculate_average_similarities(remaining, cluster, graph)
                 
             # Sort by average similarity (descending)
             sorted_remaining = sorted(
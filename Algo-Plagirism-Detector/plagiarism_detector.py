@@ -4,9 +4,14 @@ Plagiarism Detector - Main Module
 This module orchestrates the entire plagiarism detection process.
 """
 
+import hashlib
 import os
+import shelve
 import time
-from typing import Dict, List, Set, Tuple, Any
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import IO, Dict, Iterable, Iterator, List, Set, Tuple, Any, Union
 import argparse
 
 from code_parser import CodeParser
@@ -16,17 +21,65 @@ from clustering import Clustering
 from greedy_selection import GreedySelection
 from bplus_tree import BPlusTree
 
+# Bump when tokenization changes, so cached token lists of older versions are ignored
+_TOKEN_CACHE_VERSION = 1
+
+# Batches smaller than this many bytes are read and parsed serially: starting
+# I/O threads and worker processes costs more than handling the files inline
+_PARALLEL_MIN_BYTES = 1 << 20
+
+
+@lru_cache(maxsize=None)
+def _worker_parser() -> CodeParser:
+    """Return the code parser of the current worker process, created on first use."""
+    return CodeParser()
+
+
+def _read_submission(file_path: str) -> Tuple[str, bytes]:
+    """
+    Read the raw contents of a submission file.
+    
+    Args:
+        file_path: Path to the submission file
+        
+    Returns:
+        Tuple (file_path, data); data is empty if the file could not be read
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            return file_path, f.read()
+    except Exception as e:
+        print(f"Error parsing file {file_path}: {e}")
+        return file_path, b''
+
+
+def _parse_one(item: Tuple[str, bytes]) -> Tuple[str, List[str]]:
+    """
+    Parse the contents of a submission file in a worker process.
+    
+    Args:
+        item: Tuple (file_path, data) as returned by _read_submission
+        
+    Returns:
+        Tuple (file_path, tokens)
+    """
+    file_path, data = item
+    return file_path, _worker_parser().parse_bytes(data, file_path)
+
+
 class PlagiarismDetector:
     """
     Main class for plagiarism detection in code submissions.
     """
     
-    def __init__(self, similarity_threshold: float = 0.7):
+    def __init__(self, similarity_threshold: float = 0.7, token_cache_path: str = None):
         """
         Initialize the plagiarism detector.
         
         Args:
             similarity_threshold: Threshold for considering two submissions similar (0.0 to 1.0)
+            token_cache_path: Optional path of an on-disk cache of parsed tokens, keyed by
+                file contents, so unchanged files are not parsed again on later runs
         """
         self.parser = CodeParser()
         self.rabin_karp = RabinKarp()
@@ -36,24 +89,139 @@ class PlagiarismDetector:
         self.metadata_store = BPlusTree()
         self.similarity_threshold = similarity_threshold
         self.submissions = {}  # Dictionary to store parsed submissions
+        self.kgrams = {}  # K-gram hash set of each submission, computed once
+        self._kgram_index = {}  # Inverted index: k-gram hash -> IDs of submissions containing it
+        self.token_cache = shelve.open(token_cache_path) if token_cache_path else None
+    
+    def close(self) -> None:
+        """Close the on-disk token cache, if one is open."""
+        if self.token_cache is not None:
+            self.token_cache.close()
+            self.token_cache = None
+    
+    def reset_submissions(self) -> None:
+        """
+        Forget all submissions so the detector can be reused on a new set of files.
+        
+        The parser, the Rabin-Karp token table and the token cache are kept, so their
+        setup is paid once across runs.
+        """
+        self.similarity_graph = SimilarityGraph(self.similarity_threshold)
+        self.metadata_store = BPlusTree()
+        self.submissions = {}
+        self.kgrams = {}
+        self._kgram_index = {}
+    
+    def _token_cache_key(self, data: bytes, file_path: str) -> str:
+        """
+        Build the token cache key of a submission.
+        
+        Args:
+            data: Raw contents of the submission file
+            file_path: Name or path of the submission file, which selects the language
+            
+        Returns:
+            Key combining the cache version, language and SHA-256 of the contents
+        """
+        language = self.parser.detect_language(file_path)
+        return f"{_TOKEN_CACHE_VERSION}:{language}:{hashlib.sha256(data).hexdigest()}"
+    
+    def _parse_bytes_cached(self, data: bytes, file_path: str) -> List[str]:
+        """
+        Parse raw file contents, reusing tokens from the token cache if possible.
+        
+        Args:
+            data: Raw contents of the submission file
+            file_path: Name or path of the submission file
+            
+        Returns:
+            List of tokens
+        """
+        if self.token_cache is None:
+            return self.parser.parse_bytes(data, file_path)
+        
+        key = self._token_cache_key(data, file_path)
+        tokens = self.token_cache.get(key)
+        if tokens is None:
+            tokens = self.parser.parse_bytes(data, file_path)
+            self.token_cache[key] = tokens
+        return tokens
+    
+    def _skip_cached(self, contents: Iterable[Tuple[str, bytes]], cached: Dict[str, List[str]],
+                     miss_keys: Dict[str, str]) -> Iterator[Tuple[str, bytes]]:
+        """
+        Filter out files whose tokens are already in the token cache.
+        
+        Args:
+            contents: Tuples (file_path, data) of the files to parse
+            cached: Filled with the cached tokens of each skipped file path
+            miss_keys: Filled with the cache key of each file path that still needs parsing
+            
+        Returns:
+            Iterator over the tuples (file_path, data) that are not cached
+        """
+        for file_path, data in contents:
+            key = self._token_cache_key(data, file_path)
+            tokens = self.token_cache.get(key)
+            if tokens is None:
+                miss_keys[file_path] = key
+                yield file_path, data
+            else:
+                cached[file_path] = tokens
         
-    def add_submission(self, file_path: str, metadata: Dict[str, Any] = None) -> str:
+    def add_submission(self, source: Union[str, IO], metadata: Dict[str, Any] = None) -> str:
         """
         Add a new submission to the detector.
         
         Args:
-            file_path: Path to the submission file
+            source: Path to the submission file, or a readable file-like object
+                with a name attribute (such as an uploaded file)
             metadata: Additional metadata for the submission
             
         Returns:
             submission_id: Unique identifier for the submission
         """
-        # Generate a submission ID based on file name
-        submission_id = os.path.basename(file_path)
+        if hasattr(source, 'read'):
+            # Parse in-memory contents directly, no need to stage them on disk
+            submission_id = os.path.basename(source.name)
+            data = source.read()
+            if isinstance(data, bytes):
+                tokens = self._parse_bytes_cached(data, submission_id)
+            else:
+                tokens = self.parser.parse_content(data, submission_id)
+        elif self.token_cache is not None:
+            # Generate a submission ID based on file name
+            submission_id = os.path.basename(source)
+            
+            # Parse the submission, unless its contents were parsed before
+            tokens = self._parse_bytes_cached(_read_submission(source)[1], source)
+        else:
+            # Generate a submission ID based on file name
+            submission_id = os.path.basename(source)
+            
+            # Parse the submission
+            tokens = self.parser.parse_file(source)
+        
+        self._store_submission(submission_id, tokens, metadata)
+        
+        return submission_id
+    
+    def _store_submission(self, submission_id: str, tokens: List[str], metadata: Dict[str, Any] = None) -> None:
+        """
+        Store a parsed submission and compare it with the existing ones.
+        
+        Args:
+            submission_id: Unique identifier for the submission
+            tokens: Tokens of the parsed submission
+            metadata: Additional metadata for the submission
+        """
+        # Drop the postings of a previous submission with the same ID
+        if submission_id in self.kgrams:
+            for hash_value in self.kgrams[submission_id]:
+                self._kgram_index[hash_value].remove(submission_id)
         
-        # Parse the submission
-        tokens = self.parser.parse_file(file_path)
         self.submissions[submission_id] = tokens
+        self.kgrams[submission_id] = self.rabin_karp.kgrams_of(tokens)
         
         # Store metadata
         if metadata:
@@ -61,8 +229,6 @@ class PlagiarismDetector:
         
         # Update similarity graph with the new submission
         self._update_graph_with_submission(submission_id)
-        
-        return submission_id
     
     def _update_graph_with_submission(self, new_submission_id: str) -> None:
         """
@@ -71,19 +237,73 @@ class PlagiarismDetector:
         Args:
             new_submission_id: ID of the new submission
         """
-        new_tokens = self.submissions[new_submission_id]
+        new_kgrams = self.kgrams[new_submission_id]
+        new_size = len(new_kgrams)
+        threshold = self.similarity_threshold
+        
+        # Count shared k-grams with every existing submission in one pass
+        # over the inverted index, instead of intersecting sets pair by pair
+        shared = Counter()
+        for hash_value in new_kgrams:
+            postings = self._kgram_index.get(hash_value)
+            if postings:
+                shared.update(postings)
+            else:
+                self._kgram_index[hash_value] = postings = []
+            postings.append(new_submission_id)
         
         # Compare with all existing submissions
-        for existing_id, existing_tokens in self.submissions.items():
+        edges = []
+        for existing_id, existing_kgrams in self.kgrams.items():
             if existing_id == new_submission_id:
                 continue
-                
-            # Calculate similarity using Rabin-Karp
-            similarity = self.rabin_karp.calculate_similarity(new_tokens, existing_tokens)
+            
+            # Jaccard similarity: |intersection| / |union|
+            existing_size = len(existing_kgrams)
+            if not new_size or not existing_size:
+                similarity = 0.0
+            elif min(new_size, existing_size) / max(new_size, existing_size) < threshold:
+                # Jaccard can never exceed the ratio of the set sizes
+                continue
+            else:
+                matches = shared[existing_id]
+                similarity = matches / (new_size + existing_size - matches)
             
             # Add edge to graph if similarity is above threshold
-            if similarity >= self.similarity_threshold:
-                self.similarity_graph.add_edge(new_submission_id, existing_id, similarity)
+            if similarity >= threshold:
+                edges.append((new_submission_id, existing_id, similarity))
+        
+        self.similarity_graph.add_edges(edges)
+    
+    def pairwise_similarity_matrix(self) -> Tuple[List[str], List[List[float]]]:
+        """
+        Calculate the similarity between every pair of submissions at once.
+        
+        Shared k-grams are counted through the inverted index, one pass per
+        submission, instead of comparing the submissions pair by pair.
+        
+        Returns:
+            Tuple (ids, matrix) where ids lists the submission IDs in insertion order
+            and matrix[i][j] is the similarity of ids[i] and ids[j] (1.0 on the diagonal)
+        """
+        ids = list(self.kgrams)
+        index = {submission_id: i for i, submission_id in enumerate(ids)}
+        sizes = [len(self.kgrams[submission_id]) for submission_id in ids]
+        
+        matrix = [[0.0] * len(ids) for _ in ids]
+        for i, submission_id in enumerate(ids):
+            shared = Counter()
+            for hash_value in self.kgrams[submission_id]:
+                shared.update(self._kgram_index[hash_value])
+            
+            # Jaccard similarity: |intersection| / |union|
+            row = matrix[i]
+            for other_id, matches in shared.items():
+                j = index[other_id]
+                row[j] = matches / (sizes[i] + sizes[j] - matches)
+            row[i] = 1.0
+        
+        return ids, matrix
     
     def detect_plagiarism(self) -> List[Dict]:
         """
@@ -119,13 +339,18 @@ class PlagiarismDetector:
         
         return results
     
-    def batch_process(self, directory: str, metadata_file: str = None) -> List[Dict]:
+    def batch_process(self, directory: str, metadata_file: str = None, max_workers: int = None) -> List[Dict]:
         """
         Process all submissions in a directory.
         
+        Batches of at least _PARALLEL_MIN_BYTES are read by a thread pool
+        and parsed in parallel worker processes, smaller ones serially; the
+        similarity graph is then updated serially in directory order.
+        
         Args:
             directory: Directory containing submission files
             metadata_file: Optional path to a file containing metadata for submissions
+            max_workers: Number of parser processes for large batches (defaults to the number of CPUs)
             
         Returns:
             Results of plagiarism detection
@@ -146,14 +371,45 @@ class PlagiarismDetector:
                                 submission_metadata[key] = value
                         metadata[submission_id] = submission_metadata
         
-        # Process all files in the directory
-        for filename in os.listdir(directory):
-            file_path = os.path.join(directory, filename)
-            if os.path.isfile(file_path):
-                submission_id = self.add_submission(
-                    file_path, 
-                    metadata.get(os.path.basename(file_path), {})
-                )
+        # Collect all files in the directory, with their total size
+        file_paths = []
+        total_bytes = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    file_paths.append(entry.path)
+                    total_bytes += entry.stat().st_size
+        
+        # Small batches are read and parsed serially. Larger ones are read on
+        # I/O threads and parsed in worker processes as their contents arrive
+        cached = {}
+        miss_keys = {}
+        if total_bytes < _PARALLEL_MIN_BYTES:
+            contents = map(_read_submission, file_paths)
+            if self.token_cache is not None:
+                contents = self._skip_cached(contents, cached, miss_keys)
+            parsed = {path: self.parser.parse_bytes(data, path) for path, data in contents}
+        else:
+            workers = min(max_workers or os.cpu_count() or 1, len(file_paths))
+            with ThreadPoolExecutor() as io_executor:
+                contents = io_executor.map(_read_submission, file_paths)
+                if self.token_cache is not None:
+                    contents = self._skip_cached(contents, cached, miss_keys)
+                if workers > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        parsed = dict(executor.map(_parse_one, contents, chunksize=8))
+                else:
+                    parsed = {path: self.parser.parse_bytes(data, path) for path, data in contents}
+        
+        # Remember newly parsed files in the token cache
+        for path, key in miss_keys.items():
+            self.token_cache[key] = parsed[path]
+        parsed.update(cached)
+        
+        # Add them to the similarity graph one by one
+        for path in file_paths:
+            submission_id = os.path.basename(path)
+            self._store_submission(submission_id, parsed[path], metadata.get(submission_id, {}))
         
         # Detect plagiarism
         return self.detect_plagiarism()
@@ -165,10 +421,14 @@ def main():
     parser.add_argument('--metadata', '-m', help='File containing metadata for submissions')
     parser.add_argument('--threshold', '-t', type=float, default=0.7, 
                         help='Similarity threshold (0.0 to 1.0)')
+    parser.add_argument('--cache', '-c', help='File to cache parsed tokens in between runs')
     args = parser.parse_args()
     
-    detector = PlagiarismDetector(similarity_threshold=args.threshold)
-    results = detector.batch_process(args.directory, args.metadata)
+    detector = PlagiarismDetector(similarity_threshold=args.threshold, token_cache_path=args.cache)
+    try:
+        results = detector.batch_process(args.directory, args.metadata)
+    finally:
+        detector.close()
     
     # Print results
     print(f"Found {len(results)} clusters of similar submissions:")
@@ -4,14 +4,53 @@ Rabin-Karp Module
 This module implements the Rabin-Karp algorithm for finding matching sequences in code.
 """
 
-from typing import List, Set, Tuple, Dict
-import hashlib
+from array import array
+from collections import defaultdict
+from typing import AbstractSet, FrozenSet, List, Set, Tuple, Dict, Sequence
+
+
+def rolling_hashes(ids: Sequence[int], k: int, base: int, mod: int) -> List[int]:
+    """
+    Compute the polynomial rolling hash of every window of k token IDs.
+    
+    Args:
+        ids: Sequence of interned token IDs
+        k: Window size
+        base: Base of the polynomial hash
+        mod: Modulus of the polynomial hash
+        
+    Returns:
+        List of window hashes, one per starting position
+    """
+    if len(ids) < k:
+        return []
+    
+    base_pow_k = pow(base, k, mod)
+    
+    # Hash of the first window using Horner's rule
+    hash_value = 0
+    for token_id in ids[:k]:
+        hash_value = (hash_value * base + token_id) % mod
+    hashes = [hash_value]
+    append = hashes.append
+    
+    # Roll the window: drop the leading token and append the next one
+    for old_id, new_id in zip(ids, ids[k:]):
+        hash_value = (hash_value * base - old_id * base_pow_k + new_id) % mod
+        append(hash_value)
+    
+    return hashes
+
 
 class RabinKarp:
     """
     Implementation of the Rabin-Karp algorithm for finding matching sequences in code.
     """
     
+    # Base and modulus (Mersenne prime 2^61 - 1) of the polynomial rolling hash
+    HASH_BASE = 1000003
+    HASH_MOD = (1 << 61) - 1
+    
     def __init__(self, k_gram_size: int = 5):
         """
         Initialize the Rabin-Karp algorithm.
@@ -20,6 +59,7 @@ class RabinKarp:
             k_gram_size: Size of the k-grams (sequences) to compare
         """
         self.k_gram_size = k_gram_size
+        self._token_ids = {}  # Interned integer ID of every token seen so far
     
     def calculate_similarity(self, tokens1: List[str], tokens2: List[str]) -> float:
         """
@@ -35,62 +75,87 @@ class RabinKarp:
         if not tokens1 or not tokens2:
             return 0.0
         
-        # Generate k-grams and their hashes for both token sequences
-        k_grams1 = self._generate_k_grams(tokens1)
-        k_grams2 = self._generate_k_grams(tokens2)
+        return self.jaccard_from_sets(self.kgrams_of(tokens1), self.kgrams_of(tokens2))
+    
+    def kgrams_of(self, tokens: List[str]) -> FrozenSet[int]:
+        """
+        Compute the set of distinct k-gram hashes of a token sequence.
         
-        # Find matching k-grams
-        matches = self._find_matches(k_grams1, k_grams2)
+        The result can be cached by the caller and compared repeatedly with
+        jaccard_from_sets.
+        
+        Args:
+            tokens: Sequence of tokens
+            
+        Returns:
+            Frozen set of k-gram hash values
+        """
+        # Only the distinct k-gram hashes matter here, not their positions
+        return frozenset(self._window_hashes(tokens))
+    
+    @staticmethod
+    def jaccard_from_sets(k_grams1: AbstractSet[int], k_grams2: AbstractSet[int]) -> float:
+        """
+        Calculate the Jaccard similarity of two precomputed k-gram hash sets.
         
+        Args:
+            k_grams1: K-gram hashes of the first sequence
+            k_grams2: K-gram hashes of the second sequence
+            
+        Returns:
+            Similarity score between 0.0 and 1.0
+        """
         # Calculate Jaccard similarity: |intersection| / |union|
         if not k_grams1 or not k_grams2:
             return 0.0
-            
-        union_size = len(k_grams1) + len(k_grams2) - len(matches)
+        
+        matches = len(k_grams1 & k_grams2)
+        union_size = len(k_grams1) + len(k_grams2) - matches
         if union_size == 0:
             return 0.0
             
-        return len(matches) / union_size
+        return matches / union_size
     
-    def _generate_k_grams(self, tokens: List[str]) -> Dict[str, List[int]]:
+    def _window_hashes(self, tokens: List[str]) -> List[int]:
         """
-        Generate k-grams from a token sequence.
+        Hash every k-gram of a token sequence.
         
         Args:
             tokens: Sequence of tokens
             
         Returns:
-            Dictionary mapping hash values to positions in the token sequence
+            List of k-gram hashes, one per starting position
         """
-        k_grams = {}
-        
         if len(tokens) < self.k_gram_size:
-            return k_grams
+            return []
         
-        # Generate k-grams and their hash values
-        for i in range(len(tokens) - self.k_gram_size + 1):
-            k_gram = ' '.join(tokens[i:i+self.k_gram_size])
-            hash_value = self._hash(k_gram)
-            
-            if hash_value not in k_grams:
-                k_grams[hash_value] = []
-            k_grams[hash_value].append(i)
+        # Intern tokens to small integers
+        token_ids = self._token_ids
+        ids = array('q', [token_ids.setdefault(token, len(token_ids) + 1) for token in tokens])
         
-        return k_grams
+        return rolling_hashes(ids, self.k_gram_size, self.HASH_BASE, self.HASH_MOD)
     
-    def _hash(self, k_gram: str) -> str:
+    def _generate_k_grams(self, tokens: List[str]) -> Dict[int, List[int]]:
         """
-        Hash a k-gram using MD5.
+        Generate k-grams from a token sequence.
+        
+        Each k-gram is hashed with a polynomial rolling hash over interned
+        token IDs, so moving the window by one token is O(1).
         
         Args:
-            k_gram: String representation of a k-gram
+            tokens: Sequence of tokens
             
         Returns:
-            Hash value of the k-gram
+            Dictionary mapping hash values to positions in the token sequence
         """
-        return hashlib.md5(k_gram.encode()).hexdigest()
+        k_grams = defaultdict(list)
+        
+        for i, hash_value in enumerate(self._window_hashes(tokens)):
+            k_grams[hash_value].append(i)
+        
+        return dict(k_grams)
     
-    def _find_matches(self, k_grams1: Dict[str, List[int]], k_grams2: Dict[str, List[int]]) -> Set[str]:
+    def _find_matches(self, k_grams1: Dict[int, List[int]], k_grams2: Dict[int, List[int]]) -> Set[int]:
         """
         Find matching k-grams between two sequences.
         
@@ -101,14 +166,8 @@ class RabinKarp:
         Returns:
             Set of hash values of matching k-grams
         """
-        matches = set()
-        
-        # Find hash values that appear in both sequences
-        for hash_value in k_grams1:
-            if hash_value in k_grams2:
-                matches.add(hash_value)
-        
-        return matches
+        # Hash values that appear in both sequences
+        return k_grams1.keys() & k_grams2.keys()
     
     def find_matching_sequences(self, tokens1: List[str], tokens2: List[str]) -> List[Tuple[int, int, int]]:
         """
@@ -129,17 +188,29 @@ class RabinKarp:
         k_grams1 = self._generate_k_grams(tokens1)
         k_grams2 = self._generate_k_grams(tokens2)
         
-        # Find matching k-grams and extend them
+        # Find matching k-grams
+        starts = []
+        for hash_value in self._find_matches(k_grams1, k_grams2):
+            for pos1 in k_grams1[hash_value]:
+                for pos2 in k_grams2[hash_value]:
+                    # Verify the match (in case of hash collision)
+                    if tokens1[pos1:pos1+self.k_gram_size] == tokens2[pos2:pos2+self.k_gram_size]:
+                        starts.append((pos1, pos2))
+        
+        # Extend them. Matches on the same diagonal are visited left to right,
+        # and a match starting one token after another one is exactly one
+        # token shorter, so each run of equal tokens is only scanned once.
+        starts.sort()
+        lengths = {}
         matches = []
-        for hash_value in k_grams1:
-            if hash_value in k_grams2:
-                for pos1 in k_grams1[hash_value]:
-                    for pos2 in k_grams2[hash_value]:
-                        # Verify the match (in case of hash collision)
-                        if tokens1[pos1:pos1+self.k_gram_size] == tokens2[pos2:pos2+self.k_gram_size]:
-                            # Try to extend the match
-                            length = self._extend_match(tokens1, tokens2, pos1, pos2)
-                            matches.append((pos1, pos2, length))
+        for pos1, pos2 in starts:
+            previous = lengths.get((pos1 - 1, pos2 - 1))
+            if previous is not None:
+                length = previous - 1
+            else:
+                length = self._extend_match(tokens1, tokens2, pos1, pos2)
+            lengths[pos1, pos2] = length
+            matches.append((pos1, pos2, length))
         
         # Merge overlapping matches
         return self._merge_overlapping_matches(matches)
@@ -181,8 +252,10 @@ class RabinKarp:
         if not matches:
             return []
         
-        # Sort matches by position in the first sequence
-        sorted_matches = sorted(matches, key=lambda m: (m[0], m[1]))
+        # Sort matches by position in the first sequence, then in the second.
+        # (pos1, pos2) pairs are unique, so plain tuple order is the same and
+        # avoids calling a key function per match.
+        sorted_matches = sorted(matches)
         
         merged = []
         current = sorted_matches[0]
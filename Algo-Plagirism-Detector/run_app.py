@@ -10,12 +10,23 @@ import sys
 def main():
     """Run the Streamlit app."""
     try:
-        # Try to run the app using the streamlit module
-        subprocess.run([sys.executable, "-m", "streamlit", "run", "app.py"])
-    except Exception as e:
-        print(f"Error running Streamlit app: {e}")
-        print("Please make sure Streamlit is installed:")
-        print("pip install streamlit")
+        # Run the Streamlit CLI in this interpreter instead of spawning a new one
+        from streamlit.web import cli as stcli
+    except ImportError:
+        stcli = None
+
+    if stcli is None:
+        try:
+            # Older or missing Streamlit: launch it as a module in a new interpreter
+            subprocess.run([sys.executable, "-m", "streamlit", "run", "app.py"])
+        except Exception as e:
+            print(f"Error running Streamlit app: {e}")
+            print("Please make sure Streamlit is installed:")
+            print("pip install streamlit")
+        return
+
+    sys.argv = ["streamlit", "run", "app.py"]
+    stcli.main()
 
 if __name__ == "__main__":
     main()
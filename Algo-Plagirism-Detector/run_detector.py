@@ -7,6 +7,8 @@ This script will run the detector on the test cases and display the results.
 import os
 import sys
 import argparse
+from itertools import combinations
+from operator import itemgetter
 from plagiarism_detector import PlagiarismDetector
 
 def print_header(text, char='=', width=80):
@@ -38,7 +40,8 @@ def run_detector(directory, similarity_threshold=0.7):
     
     # List files in the directory
     print("Files to analyze:")
-    files = [f for f in os.listdir(directory) if os.path.isfile(os.path.join(directory, f)) and f != "metadata.txt"]
+    with os.scandir(directory) as entries:
+        files = [entry.name for entry in entries if entry.is_file() and entry.name != "metadata.txt"]
     for file in files:
         print(f"  - {file}")
     
@@ -64,6 +67,13 @@ def run_detector(directory, similarity_threshold=0.7):
     
     # Detect plagiarism
     results = detector.detect_plagiarism()
+
+    # Compute the similarity of every pair in one batch and reuse it in every section below
+    ids, similarity_matrix = detector.pairwise_similarity_matrix()
+    id_to_idx = {submission_id: i for i, submission_id in enumerate(ids)}
+
+    def sim(id1, id2):
+        return similarity_matrix[id_to_idx[id1]][id_to_idx[id2]]
     
     # Display results
     print_header("PLAGIARISM DETECTION RESULTS")
@@ -77,7 +87,7 @@ def run_detector(directory, similarity_threshold=0.7):
             print_subheader(f"CLUSTER {i+1}: {len(result['cluster'])} submissions")
             
             # Get the representatives for this cluster
-            representatives = result['representatives']
+            representatives = set(result['representatives'])
             
             # Print all submissions in the cluster, marking representatives
             print("\nSubmissions in this cluster:")
@@ -99,15 +109,12 @@ def run_detector(directory, similarity_threshold=0.7):
             print("\nSimilarity Information:")
             for idx1, sub1 in enumerate(result['cluster']):
                 sub1_id = sub1['id']
-                for idx2, sub2 in enumerate(result['cluster']):
-                    if idx1 < idx2:  # Only print each pair once
-                        sub2_id = sub2['id']
-                        similarity = detector.rabin_karp.calculate_similarity(
-                            detector.submissions[sub1_id], 
-                            detector.submissions[sub2_id]
-                        )
-                        percentage = similarity * 100
-                        print(f"  - {sub1_id} and {sub2_id}: {percentage:.2f}% similarity")
+                # Read this submission's similarities straight from its matrix row
+                row = similarity_matrix[id_to_idx[sub1_id]]
+                for sub2 in result['cluster'][idx1 + 1:]:  # Only print each pair once
+                    sub2_id = sub2['id']
+                    percentage = row[id_to_idx[sub2_id]] * 100
+                    print(f"  - {sub1_id} and {sub2_id}: {percentage:.2f}% similarity")
     
     # Print plagiarism percentages for all files
     print_header("PLAGIARISM PERCENTAGES FOR ALL FILES")
@@ -115,31 +122,35 @@ def run_detector(directory, similarity_threshold=0.7):
     # Get all submissions (excluding metadata.txt)
     all_submissions = [s for s in detector.submissions.keys() if s != "metadata.txt"]
     
+    # Collect the similarities of each file, computing every unordered pair once
+    file_similarities = {file: [] for file in all_submissions}
+    for file1, file2 in combinations(all_submissions, 2):
+        similarity = sim(file1, file2)
+        file_similarities[file1].append((file2, similarity))
+        file_similarities[file2].append((file1, similarity))
+    
     # Calculate and print plagiarism percentages
     print("\nPlagiarism percentages for each file compared to all other files:")
+    # Collect the report lines and write them in one call instead of one print per pair
+    out_lines = []
+    threshold_percentage = similarity_threshold * 100
     for file1 in sorted(all_submissions):
-        print(f"\n{file1} plagiarism percentages:")
+        out_lines.append(f"\n{file1} plagiarism percentages:")
         
-        # Sort other files by similarity (highest first)
-        similarities = []
-        for file2 in all_submissions:
-            if file1 != file2:
-                similarity = detector.rabin_karp.calculate_similarity(
-                    detector.submissions[file1],
-                    detector.submissions[file2]
-                )
-                similarities.append((file2, similarity))
+        similarities = file_similarities[file1]
         
         # Sort by similarity (highest first)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        similarities.sort(key=itemgetter(1), reverse=True)
         
         # Print similarities as percentages
         for file2, similarity in similarities:
             percentage = similarity * 100
             status = ""
-            if percentage >= similarity_threshold * 100:
+            if percentage >= threshold_percentage:
                 status = " [PLAGIARISM DETECTED]"
-            print(f"  - {percentage:.2f}% similar to {file2}{status}")
+            out_lines.append(f"  - {percentage:.2f}% similar to {file2}{status}")
+    if out_lines:
+        sys.stdout.write("\n".join(out_lines) + "\n")
     
     # Print summary
     print_header("SUMMARY")
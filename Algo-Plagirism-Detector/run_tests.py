@@ -6,15 +6,19 @@ Test script for the plagiarism detector.
 import os
 import sys
 import argparse
+from itertools import combinations
+from operator import itemgetter
 from plagiarism_detector import PlagiarismDetector
 
-def run_test_case(test_case_dir, similarity_threshold=0.7):
+def run_test_case(test_case_dir, similarity_threshold=0.7, detector=None):
     """
     Run the plagiarism detector on a test case.
 
     Args:
         test_case_dir: Directory containing the test case files
         similarity_threshold: Threshold for considering two submissions similar
+        detector: Optional plagiarism detector to reuse; its submissions are reset here.
+            A new detector with similarity_threshold is created when omitted
     """
     print(f"\n{'=' * 80}")
     print(f"Running test case: {os.path.basename(test_case_dir)}")
@@ -25,19 +29,22 @@ def run_test_case(test_case_dir, similarity_threshold=0.7):
         print(f"Error: Test case directory {test_case_dir} does not exist.")
         return
 
+    # List the directory in one pass, collecting the submission files as we go
     print(f"Listing contents of {test_case_dir}:")
+    files = []
     try:
-        for item in os.listdir(test_case_dir):
-            item_path = os.path.join(test_case_dir, item)
-            if os.path.isfile(item_path):
-                print(f"  - File: {item}")
-            elif os.path.isdir(item_path):
-                print(f"  - Dir: {item}")
+        with os.scandir(test_case_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    print(f"  - File: {entry.name}")
+                    if entry.name != "metadata.txt":
+                        files.append(entry.name)
+                elif entry.is_dir():
+                    print(f"  - Dir: {entry.name}")
     except Exception as e:
         print(f"Error listing directory: {e}")
 
     # Check if there are any files in the test case directory
-    files = [f for f in os.listdir(test_case_dir) if os.path.isfile(os.path.join(test_case_dir, f)) and f != "metadata.txt"]
     if not files:
         print(f"Error: No files found in test case directory {test_case_dir}.")
         return
@@ -52,12 +59,22 @@ def run_test_case(test_case_dir, similarity_threshold=0.7):
     else:
         print(f"Found metadata file: {metadata_file}")
 
-    # Create a plagiarism detector
-    detector = PlagiarismDetector(similarity_threshold=similarity_threshold)
+    # Reuse the given plagiarism detector, dropping the previous test case's submissions
+    if detector is None:
+        detector = PlagiarismDetector(similarity_threshold=similarity_threshold)
+    else:
+        detector.reset_submissions()
 
     # Process the test case
     results = detector.batch_process(test_case_dir, metadata_file)
 
+    # Compute the similarity of every pair in one batch and reuse it in every section below
+    ids, similarity_matrix = detector.pairwise_similarity_matrix()
+    id_to_idx = {submission_id: i for i, submission_id in enumerate(ids)}
+
+    def sim(id1, id2):
+        return similarity_matrix[id_to_idx[id1]][id_to_idx[id2]]
+
     # Print results
     print(f"\n{'=' * 50}")
     print(f"PLAGIARISM DETECTION RESULTS")
@@ -74,7 +91,7 @@ def run_test_case(test_case_dir, similarity_threshold=0.7):
             print(f"{'-' * 50}")
 
             # Get the representatives for this cluster
-            representatives = result['representatives']
+            representatives = set(result['representatives'])
 
             # Print all submissions in the cluster, marking representatives
             print("\nSubmissions in this cluster:")
@@ -98,15 +115,12 @@ def run_test_case(test_case_dir, similarity_threshold=0.7):
             print("\nSimilarity Information:")
             for idx1, sub1 in enumerate(result['cluster']):
                 sub1_id = sub1['id']
-                for idx2, sub2 in enumerate(result['cluster']):
-                    if idx1 < idx2:  # Only print each pair once
-                        sub2_id = sub2['id']
-                        similarity = detector.rabin_karp.calculate_similarity(
-                            detector.submissions[sub1_id],
-                            detector.submissions[sub2_id]
-                        )
-                        percentage = similarity * 100
-                        print(f"  - {sub1_id} and {sub2_id}: {percentage:.2f}% similarity")
+                # Read this submission's similarities straight from its matrix row
+                row = similarity_matrix[id_to_idx[sub1_id]]
+                for sub2 in result['cluster'][idx1 + 1:]:  # Only print each pair once
+                    sub2_id = sub2['id']
+                    percentage = row[id_to_idx[sub2_id]] * 100
+                    print(f"  - {sub1_id} and {sub2_id}: {percentage:.2f}% similarity")
 
     # Print plagiarism percentages for all files
     print(f"\n{'=' * 50}")
@@ -116,31 +130,35 @@ def run_test_case(test_case_dir, similarity_threshold=0.7):
     # Get all submissions (excluding metadata.txt)
     all_submissions = [s for s in detector.submissions.keys() if s != "metadata.txt"]
 
+    # Collect the similarities of each file, computing every unordered pair once
+    file_similarities = {file: [] for file in all_submissions}
+    for file1, file2 in combinations(all_submissions, 2):
+        similarity = sim(file1, file2)
+        file_similarities[file1].append((file2, similarity))
+        file_similarities[file2].append((file1, similarity))
+
     # Calculate and print plagiarism percentages
     print("\nPlagiarism percentages for each file compared to all other files:")
+    # Collect the report lines and write them in one call instead of one print per pair
+    out_lines = []
+    threshold_percentage = detector.similarity_threshold * 100
     for file1 in sorted(all_submissions):
-        print(f"\n{file1} plagiarism percentages:")
-
-        # Sort other files by similarity (highest first)
-        similarities = []
-        for file2 in all_submissions:
-            if file1 != file2:
-                similarity = detector.rabin_karp.calculate_similarity(
-                    detector.submissions[file1],
-                    detector.submissions[file2]
-                )
-                similarities.append((file2, similarity))
+        out_lines.append(f"\n{file1} plagiarism percentages:")
+
+        similarities = file_similarities[file1]
 
         # Sort by similarity (highest first)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        similarities.sort(key=itemgetter(1), reverse=True)
 
         # Print similarities as percentages
         for file2, similarity in similarities:
             percentage = similarity * 100
             status = ""
-            if percentage >= similarity_threshold * 100:
+            if percentage >= threshold_percentage:
                 status = " [PLAGIARISM DETECTED]"
-            print(f"  - {percentage:.2f}% similar to {file2}{status}")
+            out_lines.append(f"  - {percentage:.2f}% similar to {file2}{status}")
+    if out_lines:
+        sys.stdout.write("\n".join(out_lines) + "\n")
 
     # Print summary of all submissions
     print(f"\n{'=' * 50}")
@@ -182,23 +200,14 @@ def run_test_case(test_case_dir, similarity_threshold=0.7):
         print(f"{'=' * 50}")
 
         submissions = sorted(detector.submissions.keys())
-        print(f"{'':15}", end="")
-        for s in submissions:
-            print(f"{s[:10]:10}", end=" ")
-        print()
-
+        # Build each row as one string and write the whole matrix at once
+        lines = [f"{'':15}" + "".join(f"{s[:10]:10} " for s in submissions)]
+        # Take every cell from the precomputed matrix, whose diagonal is 1.0
+        columns = [id_to_idx[s] for s in submissions]
         for s1 in submissions:
-            print(f"{s1[:15]:15}", end="")
-            for s2 in submissions:
-                if s1 == s2:
-                    similarity = 1.0
-                else:
-                    tokens1 = detector.submissions[s1]
-                    tokens2 = detector.submissions[s2]
-                    similarity = detector.rabin_karp.calculate_similarity(tokens1, tokens2)
-                percentage = similarity * 100
-                print(f"{percentage:5.1f}%   ", end="")
-            print()
+            row = similarity_matrix[id_to_idx[s1]]
+            lines.append(f"{s1[:15]:15}" + "".join(f"{row[j] * 100:5.1f}%   " for j in columns))
+        sys.stdout.write("\n".join(lines) + "\n")
 
 def main():
     """Main function to run the tests."""
@@ -226,11 +235,14 @@ def main():
         print(f"Error: Test cases directory {test_cases_dir} does not exist.")
         return
 
+    # Create one plagiarism detector and reuse it for every test case
+    detector = PlagiarismDetector(similarity_threshold=args.threshold)
+
     # Run specific test case if specified
     if args.test_case:
         test_case_dir = os.path.join(test_cases_dir, f"test_case_{args.test_case}")
         if os.path.isdir(test_case_dir):
-            run_test_case(test_case_dir, args.threshold)
+            run_test_case(test_case_dir, args.threshold, detector)
         else:
             print(f"Error: Test case directory {test_case_dir} does not exist.")
     else:
@@ -238,7 +250,7 @@ def main():
         for test_case in sorted(os.listdir(test_cases_dir)):
             test_case_dir = os.path.join(test_cases_dir, test_case)
             if os.path.isdir(test_case_dir):
-                run_test_case(test_case_dir, args.threshold)
+                run_test_case(test_case_dir, args.threshold, detector)
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,7 @@ Similarity Graph Module
 This module implements a graph representation of code similarity.
 """
 
+import warnings
 from typing import Dict, List, Set, Tuple, Any
 
 class SimilarityGraph:
@@ -53,6 +54,28 @@ class SimilarityGraph:
         self.graph[node1][node2] = weight
         self.graph[node2][node1] = weight
     
+    def add_edges(self, edges: List[Tuple[str, str, float]]) -> None:
+        """
+        Add several edges at once.
+        
+        Equivalent to calling add_edge for each edge in order, without the
+        per-edge method call overhead.
+        
+        Args:
+            edges: List of tuples (node1, node2, weight)
+        """
+        graph = self.graph
+        threshold = self.similarity_threshold
+        
+        for node1, node2, weight in edges:
+            # Only add edge if weight is above threshold
+            if weight < threshold:
+                continue
+            
+            # Add nodes if they don't exist, and edges in both directions
+            graph.setdefault(node1, {})[node2] = weight
+            graph.setdefault(node2, {})[node1] = weight
+    
     def get_neighbors(self, node: str) -> Dict[str, float]:
         """
         Get all neighbors of a node.
@@ -149,23 +172,27 @@ class SimilarityGraph:
         """
         Convert the graph to an adjacency matrix representation.
         
+        Deprecated: the dense matrix takes O(N^2) memory for a graph that only
+        keeps above-threshold edges; iterate get_neighbors() instead.
+        
         Returns:
             Tuple of (node_ids, matrix) where node_ids is a list of node IDs
             and matrix is a 2D list representing the adjacency matrix
         """
+        warnings.warn(
+            "SimilarityGraph.to_adjacency_matrix() is deprecated; use get_neighbors() instead",
+            DeprecationWarning,
+            stacklevel=2
+        )
+        
         nodes = self.get_nodes()
         n = len(nodes)
-        
-        # Create a mapping from node IDs to indices
         node_to_index = {node: i for i, node in enumerate(nodes)}
         
-        # Initialize the matrix with zeros
-        matrix = [[0.0 for _ in range(n)] for _ in range(n)]
-        
-        # Fill in the matrix
-        for i, node1 in enumerate(nodes):
-            for node2, weight in self.graph[node1].items():
-                j = node_to_index[node2]
-                matrix[i][j] = weight
+        # Initialize the matrix with zero rows, then scatter each node's edges
+        matrix = [[0.0] * n for _ in range(n)]
+        for row, node in zip(matrix, nodes):
+            for neighbor, weight in self.graph[node].items():
+                row[node_to_index[neighbor]] = weight
         
         return nodes, matrix